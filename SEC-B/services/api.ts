@@ -128,7 +128,10 @@ export async function searchNotes(request: SearchRequest): Promise<SearchRespons
  */
 export async function getUserNotes(userId: string): Promise<NoteResponse[]> {
   try {
-    const response = await fetch(`${API_BASE_URL}/notes/${userId}`, {
+    // The notes list renders content previews and seeds the editor, so
+    // request full documents; the backend's default summary projection
+    // is for callers that only need titles and tags
+    const response = await fetch(`${API_BASE_URL}/notes/${userId}?full=true`, {
       method: 'GET',
       headers: {
         'Content-Type': 'application/json',
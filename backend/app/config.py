@@ -37,6 +37,10 @@ class Settings(BaseSettings):
     # Vector Search Configuration
     vector_search_limit: int = 10
     vector_search_num_candidates: int = 100
+
+    # Embedding Cache Configuration
+    embedding_cache_size: int = 10000
+    embedding_cache_dir: str = ""  # Empty string disables the on-disk layer
     
     class Config:
         env_file = ".env"
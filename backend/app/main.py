@@ -5,9 +5,13 @@ MongoDB Atlas Vector Search RAG backend with Google Gemini embeddings
 
 from fastapi import FastAPI, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 import logging
 
+import google.generativeai as genai
+
 from app.config import get_settings
 from app.routes import notes
 from app.services.mongodb_service import mongodb_service
@@ -30,6 +34,17 @@ async def lifespan(app: FastAPI):
     """
     # Startup
     logger.info("Starting up application...")
+
+    # Pin the settings instance on app.state so request handlers and tests
+    # can reach (or monkey-patch) it without touching the lru_cache; every
+    # module-level `settings` binding aliases this same cached instance
+    app.state.settings = settings
+
+    # Configure the Gemini SDK exactly once; configure() mutates global
+    # SDK state and must not be re-run per request or per import
+    genai.configure(api_key=settings.gemini_api_key)
+    logger.info("✓ Gemini configured")
+
     try:
         await mongodb_service.connect()
         logger.info("✓ MongoDB connected")
@@ -58,7 +73,8 @@ app = FastAPI(
     description="MongoDB Atlas Vector Search RAG API with Google Gemini Embeddings",
     lifespan=lifespan,
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS for React Native
@@ -71,6 +87,11 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
+# Compress large responses for clients that accept gzip; embedding arrays
+# (768 floats of JSON per note) compress several-fold, and small payloads
+# skip compression entirely via minimum_size
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Include routers
 app.include_router(notes.router)
 
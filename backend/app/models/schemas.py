@@ -13,22 +13,33 @@ class NoteCreate(BaseModel):
     content: str = Field(..., min_length=1, description="Note content")
     user_id: str = Field(..., min_length=1, description="User identifier")
     tags: list[str] = Field(default_factory=list, description="Note tags")
+    embedding: Optional[list[float]] = Field(
+        default=None,
+        description="Precomputed embedding vector; generated server-side when omitted"
+    )
     
     @field_validator('content')
     @classmethod
     def validate_content(cls, v: str) -> str:
         """Validate content is not empty or just whitespace"""
-        if not v or not v.strip():
+        v = v.strip()
+        if not v:
             raise ValueError("Content cannot be empty")
-        return v.strip()
-    
+        return v
+
     @field_validator('title')
     @classmethod
     def validate_title(cls, v: str) -> str:
         """Validate title is not empty or just whitespace"""
-        if not v or not v.strip():
+        v = v.strip()
+        if not v:
             raise ValueError("Title cannot be empty")
-        return v.strip()
+        return v
+
+
+class NoteBulkCreate(BaseModel):
+    """Request model for creating multiple notes in one call"""
+    notes: list[NoteCreate] = Field(..., min_length=1, max_length=100, description="Notes to create")
 
 
 class NoteResponse(BaseModel):
@@ -40,12 +51,32 @@ class NoteResponse(BaseModel):
     tags: list[str]
     created_at: datetime
     updated_at: datetime
-    
+    embedding: Optional[list[float]] = Field(
+        default=None,
+        description="Embedding vector; only returned from note creation"
+    )
+
+    class Config:
+        populate_by_name = True
+
+
+class NoteSummaryResponse(BaseModel):
+    """Response model for a note without its content body"""
+    id: str = Field(..., alias="_id", description="Note ID")
+    title: str
+    user_id: str
+    tags: list[str]
+    created_at: datetime
+    updated_at: datetime
+
     class Config:
         populate_by_name = True
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+
+
+class NoteBulkResponse(BaseModel):
+    """Response model for bulk note creation"""
+    created: list[NoteResponse]
+    count: int
 
 
 class SearchQuery(BaseModel):
@@ -53,25 +84,56 @@ class SearchQuery(BaseModel):
     query: str = Field(..., min_length=1, description="Search query text")
     user_id: str = Field(..., min_length=1, description="User identifier")
     limit: int = Field(default=10, ge=1, le=50, description="Maximum results")
-    
+    min_score: float = Field(default=0.0, ge=0.0, le=1.0, description="Minimum similarity score")
+    embedding: Optional[list[float]] = Field(
+        default=None,
+        description="Precomputed query embedding; generated server-side when omitted"
+    )
+
     @field_validator('query')
     @classmethod
     def validate_query(cls, v: str) -> str:
         """Validate query is not empty or just whitespace"""
-        if not v or not v.strip():
+        v = v.strip()
+        if not v:
             raise ValueError("Query cannot be empty")
-        return v.strip()
+        return v
+
+
+class RelatedNotesQuery(BaseModel):
+    """Request model for finding notes related to an existing note"""
+    limit: int = Field(default=10, ge=1, le=50, description="Maximum results")
+    min_score: float = Field(default=0.0, ge=0.0, le=1.0, description="Minimum similarity score")
+
+
+class SearchBatchQuery(BaseModel):
+    """Request model for batched vector search"""
+    queries: list[str] = Field(..., min_length=1, max_length=20, description="Search query texts")
+    user_id: str = Field(..., min_length=1, description="User identifier")
+    limit: int = Field(default=10, ge=1, le=50, description="Maximum results per query")
+    min_score: float = Field(default=0.0, ge=0.0, le=1.0, description="Minimum similarity score")
+
+    @field_validator('queries')
+    @classmethod
+    def validate_queries(cls, v: list[str]) -> list[str]:
+        """Validate no query is empty or just whitespace"""
+        stripped = [q.strip() for q in v]
+        if not all(stripped):
+            raise ValueError("Queries cannot be empty")
+        return stripped
+
+
+class EmbedResponse(BaseModel):
+    """Response model for a standalone query embedding"""
+    query: str
+    embedding: list[float]
+    dimensions: int
 
 
 class SearchResult(BaseModel):
     """Response model for a search result"""
     note: NoteResponse
     score: float = Field(..., description="Similarity score (0-1)")
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
 
 
 class SearchResponse(BaseModel):
@@ -82,6 +144,13 @@ class SearchResponse(BaseModel):
     search_time_ms: float = 0.0
 
 
+class SearchBatchResponse(BaseModel):
+    """Response model for batched search results"""
+    per_query: list[SearchResponse]
+    count: int
+    search_time_ms: float = 0.0
+
+
 class HealthResponse(BaseModel):
     """Health check response"""
     status: str
@@ -4,16 +4,107 @@ Handles note creation and retrieval
 """
 
 from fastapi import APIRouter, HTTPException, Depends, status
-from typing import List
+from fastapi.responses import StreamingResponse
+from typing import List, Tuple
+import asyncio
+import hashlib
 import logging
+import re
+import time
+from collections import OrderedDict, defaultdict
 
-from app.models.schemas import NoteCreate, NoteResponse, SearchQuery, SearchResponse, SearchResult
+import google.generativeai as genai
+import orjson
+
+from app.config import get_settings
+from app.models.schemas import (
+    EmbedResponse,
+    NoteCreate,
+    NoteBulkCreate,
+    NoteBulkResponse,
+    NoteResponse,
+    NoteSummaryResponse,
+    RelatedNotesQuery,
+    SearchBatchQuery,
+    SearchBatchResponse,
+    SearchQuery,
+    SearchResponse,
+    SearchResult
+)
 from app.services.mongodb_service import MongoDBService, get_mongodb
-from app.services.gemini_service import generate_note_embedding, generate_query_embedding
+from app.services.gemini_service import (
+    combine_note_text,
+    generate_embeddings_batch,
+    generate_note_embedding,
+    generate_query_embedding
+)
+
+settings = get_settings()
 
 router = APIRouter(prefix="/api", tags=["notes"])
 logger = logging.getLogger(__name__)
 
+# Short-TTL cache for repeated identical searches (e.g. a client re-firing
+# the same query). Keys include a per-user version that is bumped on every
+# write for that user, so stale entries stop being addressed immediately
+# and age out of the bounded store.
+_SEARCH_CACHE_TTL = 60.0
+_SEARCH_CACHE_MAX = 10000
+_search_cache: "OrderedDict[str, Tuple[float, SearchResponse]]" = OrderedDict()
+_user_write_versions: "defaultdict[str, int]" = defaultdict(int)
+
+
+def _search_cache_key(user_id: str, query: str, limit: int, min_score: float) -> str:
+    """Build a cache key tied to the user's current write version"""
+    raw = f"{user_id}|{_user_write_versions[user_id]}|{limit}|{min_score}|{query}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _search_cache_get(key: str) -> SearchResponse | None:
+    """Return a cached search response if present and fresh"""
+    entry = _search_cache.get(key)
+    if entry is None:
+        return None
+    cached_at, response = entry
+    if time.monotonic() - cached_at > _SEARCH_CACHE_TTL:
+        del _search_cache[key]
+        return None
+    _search_cache.move_to_end(key)
+    return response
+
+
+def _search_cache_put(key: str, response: SearchResponse) -> None:
+    """Store a search response, evicting the oldest entries past the cap"""
+    _search_cache[key] = (time.monotonic(), response)
+    _search_cache.move_to_end(key)
+    while len(_search_cache) > _SEARCH_CACHE_MAX:
+        _search_cache.popitem(last=False)
+
+
+def _invalidate_user_searches(user_id: str) -> None:
+    """Invalidate cached searches for a user after a write"""
+    _user_write_versions[user_id] += 1
+
+
+# Shared GenerativeModel for tag suggestions; construction does non-trivial
+# setup, so build it once lazily instead of per request
+_tag_model = None
+
+# Compiled once: extracts the JSON array if the model wraps it in prose
+# or markdown fences despite the JSON response mime type
+_JSON_ARRAY_RE = re.compile(r'\[.*\]', re.DOTALL)
+
+
+def _get_tag_model() -> genai.GenerativeModel:
+    """Get the shared tag-suggestion model, creating it on first use"""
+    global _tag_model
+    if _tag_model is None:
+        _tag_model = genai.GenerativeModel(
+            'gemini-2.0-flash-exp',
+            generation_config={"response_mime_type": "application/json"}
+        )
+    return _tag_model
+
 
 @router.post(
     "/notes",
@@ -37,34 +128,40 @@ async def create_note(
     Returns the created note with ID and timestamps
     """
     try:
-        # Generate embedding from title, content, and tags
-        logger.info(f"Generating embedding for note: {note.title}")
-        embedding = await generate_note_embedding(
-            title=note.title,
-            content=note.content,
-            tags=note.tags
-        )
+        if note.embedding is not None:
+            # Caller supplied a precomputed vector; skip the embedding API
+            if len(note.embedding) != settings.gemini_embedding_dimensions:
+                raise ValueError(
+                    f"Expected {settings.gemini_embedding_dimensions} embedding "
+                    f"dimensions, got {len(note.embedding)}"
+                )
+            embedding = note.embedding
+        else:
+            # Generate embedding from title, content, and tags
+            logger.info(f"Generating embedding for note: {note.title}")
+            embedding = await generate_note_embedding(
+                title=note.title,
+                content=note.content,
+                tags=note.tags
+            )
         
-        # Store in MongoDB
+        # Store in MongoDB; create_note returns the full document,
+        # so no second round trip is needed to build the response
         logger.info(f"Storing note in MongoDB for user: {note.user_id}")
-        note_id = await db.create_note(
+        created_note = await db.create_note(
             title=note.title,
             content=note.content,
             user_id=note.user_id,
             tags=note.tags,
             embedding=embedding
         )
-        
-        # Fetch and return the created note
-        created_note = await db.get_note(note_id)
-        
-        if not created_note:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to retrieve created note"
-            )
-        
-        logger.info(f"Note created successfully: {note_id}")
+
+        _invalidate_user_searches(note.user_id)
+
+        # Echo the vector so callers can cache it for future creates
+        created_note["embedding"] = embedding
+
+        logger.info(f"Note created successfully: {created_note['_id']}")
         return NoteResponse(**created_note)
         
     except ValueError as e:
@@ -83,6 +180,134 @@ async def create_note(
         )
 
 
+@router.post(
+    "/notes/bulk",
+    response_model=NoteBulkResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Create multiple notes",
+    description="Create multiple notes with a single batched embedding call and bulk insert"
+)
+async def create_notes_bulk(
+    bulk: NoteBulkCreate,
+    db: MongoDBService = Depends(get_mongodb)
+) -> NoteBulkResponse:
+    """
+    Create multiple notes in one request
+
+    - **notes**: List of notes to create (1-100)
+
+    Embeddings for all notes are generated in a single Gemini call,
+    and the documents are inserted with one MongoDB round trip.
+    """
+    try:
+        # Batch embedding generation: one API round trip covering every
+        # note that didn't arrive with a precomputed vector
+        embeddings = [note.embedding for note in bulk.notes]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+
+        if missing:
+            logger.info(f"Generating embeddings for {len(missing)} of {len(bulk.notes)} notes")
+            texts = [
+                combine_note_text(
+                    bulk.notes[i].title,
+                    bulk.notes[i].content,
+                    bulk.notes[i].tags
+                )
+                for i in missing
+            ]
+            generated = await generate_embeddings_batch(texts, task_type="retrieval_document")
+            for i, embedding in zip(missing, generated):
+                embeddings[i] = embedding
+
+        for embedding in embeddings:
+            if len(embedding) != settings.gemini_embedding_dimensions:
+                raise ValueError(
+                    f"Expected {settings.gemini_embedding_dimensions} embedding "
+                    f"dimensions, got {len(embedding)}"
+                )
+
+        # Bulk insert into MongoDB
+        docs = [
+            {
+                "title": note.title,
+                "content": note.content,
+                "user_id": note.user_id,
+                "tags": note.tags,
+                "embedding": embedding
+            }
+            for note, embedding in zip(bulk.notes, embeddings)
+        ]
+        created_docs = await db.create_notes(docs)
+
+        for user_id in {note.user_id for note in bulk.notes}:
+            _invalidate_user_searches(user_id)
+
+        # Echo the vectors so callers can cache them for future creates
+        for doc, embedding in zip(created_docs, embeddings):
+            doc["embedding"] = embedding
+
+        logger.info(f"Created {len(created_docs)} notes in bulk")
+        return NoteBulkResponse(
+            created=[NoteResponse(**doc) for doc in created_docs],
+            count=len(created_docs)
+        )
+
+    except ValueError as e:
+        # Validation errors
+        logger.warning(f"Validation error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+    except Exception as e:
+        # Internal errors
+        logger.error(f"Error creating notes in bulk: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create notes: {str(e)}"
+        )
+
+
+@router.get(
+    "/embed",
+    response_model=EmbedResponse,
+    summary="Embed a query string",
+    description="Return the embedding vector for a query so callers can reuse it across searches"
+)
+async def embed_query(q: str) -> EmbedResponse:
+    """
+    Compute a query embedding without running a search
+
+    - **q**: Query text to embed (required, non-empty)
+
+    Callers that issue the same search repeatedly can fetch the vector
+    once and pass it back via SearchQuery.embedding, paying for one
+    embedding call instead of one per search.
+    """
+    try:
+        q = q.strip()
+        if not q:
+            raise ValueError("Query cannot be empty")
+
+        embedding = await generate_query_embedding(q)
+        return EmbedResponse(query=q, embedding=embedding, dimensions=len(embedding))
+
+    except ValueError as e:
+        # Validation errors
+        logger.warning(f"Validation error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+    except Exception as e:
+        # Internal errors
+        logger.error(f"Error embedding query: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to embed query: {str(e)}"
+        )
+
+
 @router.post(
     "/search",
     response_model=SearchResponse,
@@ -99,23 +324,44 @@ async def search_notes(
     - **query**: Search query text (required, non-empty)
     - **user_id**: User identifier (required)
     - **limit**: Maximum results to return (1-50, default 10)
+    - **min_score**: Minimum similarity score (0-1, default 0 = no filtering)
     
     Returns semantically similar notes with similarity scores
     """
-    import time
     start_time = time.time()
-    
+
+    # The cache keys on query text, so it only applies when the server
+    # embeds the text itself; a caller-supplied vector may not match the
+    # text it arrives with
+    use_cache = query.embedding is None
+    if use_cache:
+        cache_key = _search_cache_key(query.user_id, query.query, query.limit, query.min_score)
+        cached = _search_cache_get(cache_key)
+        if cached is not None:
+            logger.info(f"Search cache hit for user: {query.user_id}")
+            return cached
+
     try:
-        # Generate embedding for the search query
-        logger.info(f"Generating embedding for search query: {query.query[:50]}...")
-        query_embedding = await generate_query_embedding(query.query)
-        
+        if query.embedding is not None:
+            # Caller supplied a precomputed vector; skip the embedding API
+            if len(query.embedding) != settings.gemini_embedding_dimensions:
+                raise ValueError(
+                    f"Expected {settings.gemini_embedding_dimensions} embedding "
+                    f"dimensions, got {len(query.embedding)}"
+                )
+            query_embedding = query.embedding
+        else:
+            # Generate embedding for the search query
+            logger.info(f"Generating embedding for search query: {query.query[:50]}...")
+            query_embedding = await generate_query_embedding(query.query)
+
         # Perform vector search
         logger.info(f"Searching notes for user: {query.user_id}")
         results = await db.vector_search(
             query_embedding=query_embedding,
             user_id=query.user_id,
-            limit=query.limit
+            limit=query.limit,
+            min_score=query.min_score
         )
         
         # Format results
@@ -130,12 +376,15 @@ async def search_notes(
         search_time_ms = (time.time() - start_time) * 1000
         logger.info(f"Found {len(search_results)} results in {search_time_ms:.2f}ms")
         
-        return SearchResponse(
+        response = SearchResponse(
             results=search_results,
             query=query.query,
             count=len(search_results),
             search_time_ms=search_time_ms
         )
+        if use_cache:
+            _search_cache_put(cache_key, response)
+        return response
         
     except ValueError as e:
         # Validation errors
@@ -153,26 +402,182 @@ async def search_notes(
         )
 
 
+@router.post(
+    "/search/batch",
+    response_model=SearchBatchResponse,
+    summary="Search notes with multiple queries",
+    description="Run several semantic searches in one request with a single batched embedding call"
+)
+async def search_notes_batch(
+    batch: SearchBatchQuery,
+    db: MongoDBService = Depends(get_mongodb)
+) -> SearchBatchResponse:
+    """
+    Run multiple vector searches in a single request
+
+    - **queries**: Search query texts (1-20, each non-empty)
+    - **user_id**: User identifier (required)
+    - **limit**: Maximum results per query (1-50, default 10)
+    - **min_score**: Minimum similarity score (0-1, default 0)
+
+    All queries are embedded in one Gemini call and the vector searches
+    fan out concurrently, so N queries cost roughly one round trip.
+    """
+    start_time = time.time()
+
+    try:
+        logger.info(f"Batch searching {len(batch.queries)} queries for user: {batch.user_id}")
+        query_embeddings = await generate_embeddings_batch(
+            batch.queries,
+            task_type="retrieval_query"
+        )
+
+        results_per_query = await asyncio.gather(*(
+            db.vector_search(
+                query_embedding=embedding,
+                user_id=batch.user_id,
+                limit=batch.limit,
+                min_score=batch.min_score
+            )
+            for embedding in query_embeddings
+        ))
+
+        search_time_ms = (time.time() - start_time) * 1000
+
+        per_query = [
+            SearchResponse(
+                results=[
+                    SearchResult(
+                        note=NoteResponse(**result),
+                        score=result.get("score", 0.0)
+                    )
+                    for result in results
+                ],
+                query=query,
+                count=len(results),
+                search_time_ms=search_time_ms
+            )
+            for query, results in zip(batch.queries, results_per_query)
+        ]
+
+        logger.info(f"Batch search completed in {search_time_ms:.2f}ms")
+        return SearchBatchResponse(
+            per_query=per_query,
+            count=len(per_query),
+            search_time_ms=search_time_ms
+        )
+
+    except ValueError as e:
+        # Validation errors
+        logger.warning(f"Validation error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+    except Exception as e:
+        # Internal errors
+        logger.error(f"Batch search error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Batch search failed: {str(e)}"
+        )
+
+
+@router.post(
+    "/notes/{note_id}/related",
+    response_model=SearchResponse,
+    summary="Find notes related to a note",
+    description="Vector search seeded by a note's stored embedding, with no re-embedding"
+)
+async def related_notes(
+    note_id: str,
+    query: RelatedNotesQuery = RelatedNotesQuery(),
+    db: MongoDBService = Depends(get_mongodb)
+) -> SearchResponse:
+    """
+    Find notes similar to an existing note
+
+    - **note_id**: Source note identifier
+    - **limit**: Maximum results to return (1-50, default 10)
+    - **min_score**: Minimum similarity score (0-1, default 0)
+
+    The stored embedding seeds the vector search directly, so the client
+    never ships the note's content back and no embedding call is made.
+    """
+    start_time = time.time()
+
+    try:
+        source = await db.get_note_embedding(note_id)
+        if source is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Note not found"
+            )
+
+        # Fetch one extra result so the source note can be dropped from
+        # its own neighbourhood
+        results = await db.vector_search(
+            query_embedding=source["embedding"],
+            user_id=source["user_id"],
+            limit=query.limit + 1,
+            min_score=query.min_score
+        )
+        results = [r for r in results if r["_id"] != note_id][:query.limit]
+
+        search_results = [
+            SearchResult(
+                note=NoteResponse(**result),
+                score=result.get("score", 0.0)
+            )
+            for result in results
+        ]
+
+        search_time_ms = (time.time() - start_time) * 1000
+        logger.info(f"Found {len(search_results)} notes related to {note_id} in {search_time_ms:.2f}ms")
+
+        return SearchResponse(
+            results=search_results,
+            query=note_id,
+            count=len(search_results),
+            search_time_ms=search_time_ms
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        # Internal errors
+        logger.error(f"Related notes error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Related notes search failed: {str(e)}"
+        )
+
+
 @router.get(
     "/notes/{user_id}",
-    response_model=List[NoteResponse],
+    response_model=List[NoteResponse] | List[NoteSummaryResponse],
     summary="List user's notes",
-    description="Get all notes for a specific user"
+    description="Get all notes for a specific user; summaries by default, full content with ?full=true"
 )
 async def list_user_notes(
     user_id: str,
     limit: int = 100,
+    full: bool = False,
     db: MongoDBService = Depends(get_mongodb)
-) -> List[NoteResponse]:
+) -> List[NoteResponse] | List[NoteSummaryResponse]:
     """
     List all notes for a user
-    
+
     - **user_id**: User identifier
     - **limit**: Maximum number of notes to return
+    - **full**: Include the content body (defaults to false; summary
+      listings skip it so list views don't transfer every note's text)
     """
     try:
-        notes = await db.list_notes(user_id=user_id, limit=limit)
-        return [NoteResponse(**note) for note in notes]
+        notes = await db.list_notes(user_id=user_id, limit=limit, include_content=full)
+        if full:
+            return [NoteResponse(**note) for note in notes]
+        return [NoteSummaryResponse(**note) for note in notes]
     except Exception as e:
         logger.error(f"Error listing notes: {str(e)}")
         raise HTTPException(
@@ -181,6 +586,32 @@ async def list_user_notes(
         )
 
 
+@router.get(
+    "/notes/{user_id}/stream",
+    summary="Stream user's notes",
+    description="Stream a user's notes as newline-delimited JSON without buffering the full list"
+)
+async def stream_user_notes(
+    user_id: str,
+    limit: int = 100,
+    db: MongoDBService = Depends(get_mongodb)
+) -> StreamingResponse:
+    """
+    Stream all notes for a user as NDJSON
+
+    - **user_id**: User identifier
+    - **limit**: Maximum number of notes to stream
+
+    Each line is one note document; time-to-first-byte and peak memory
+    stay constant regardless of how many notes the user has.
+    """
+    async def note_stream():
+        async for note in db.iter_notes(user_id=user_id, limit=limit):
+            yield orjson.dumps(note) + b"\n"
+
+    return StreamingResponse(note_stream(), media_type="application/x-ndjson")
+
+
 @router.post(
     "/suggest-tags",
     summary="Get AI tag suggestions",
@@ -208,12 +639,7 @@ async def suggest_tags(
             )
         
         # Use Gemini to generate tag suggestions
-        import google.generativeai as genai
-        from app.config import get_settings
-        settings = get_settings()
-        
-        genai.configure(api_key=settings.gemini_api_key)
-        model = genai.GenerativeModel('gemini-2.0-flash-exp')
+        model = _get_tag_model()
         
         prompt = f"""Analyze this note and suggest 3-5 relevant tags. 
         
@@ -229,19 +655,17 @@ Rules:
 - Return 3-5 tags maximum
 - No explanation, just the JSON array"""
 
-        response = model.generate_content(prompt)
+        # The SDK call is synchronous; run it off the event loop
+        response = await asyncio.to_thread(model.generate_content, prompt)
         
         # Parse the JSON response
-        import json
-        import re
-        
         text = response.text.strip()
         # Extract JSON array from markdown code blocks if present
-        json_match = re.search(r'\[.*\]', text, re.DOTALL)
+        json_match = _JSON_ARRAY_RE.search(text)
         if json_match:
             text = json_match.group(0)
-        
-        suggestions = json.loads(text)
+
+        suggestions = orjson.loads(text)
         
         return {"suggestions": suggestions}
         
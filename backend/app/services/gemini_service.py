@@ -3,14 +3,83 @@ Google Gemini embedding service
 Generates vector embeddings using text-embedding-004 model
 """
 
+import asyncio
+import hashlib
+import os
+from array import array
+from collections import OrderedDict
+from typing import List, Optional
+
 import google.generativeai as genai
-from typing import List
 from app.config import get_settings
 
 settings = get_settings()
 
-# Configure Gemini API
-genai.configure(api_key=settings.gemini_api_key)
+# Note: genai.configure() is called once in main.py's lifespan startup;
+# configuring at import time made every importer mutate global SDK state
+
+# Embeddings are deterministic per (model, task_type, text), so identical
+# inputs can skip the API round trip entirely. Two tiers: an in-process LRU
+# and an optional on-disk layer (float32 binary files) for cross-process reuse.
+_embedding_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+
+
+def _cache_key(text: str, task_type: str) -> str:
+    """Build a stable cache key for an embedding request"""
+    raw = f"{settings.gemini_embedding_model}|{task_type}|{text}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _disk_cache_path(key: str) -> Optional[str]:
+    """Path of the on-disk cache entry, or None if the disk layer is disabled"""
+    if not settings.embedding_cache_dir:
+        return None
+    return os.path.join(settings.embedding_cache_dir, f"{key}.f32")
+
+
+def _cache_get(key: str) -> Optional[List[float]]:
+    """Look up an embedding in the memory cache, then the disk cache"""
+    cached = _embedding_cache.get(key)
+    if cached is not None:
+        _embedding_cache.move_to_end(key)
+        return cached
+
+    path = _disk_cache_path(key)
+    if path and os.path.exists(path):
+        try:
+            vec = array("f")
+            with open(path, "rb") as f:
+                vec.frombytes(f.read())
+            embedding = vec.tolist()
+            _cache_put_memory(key, embedding)
+            return embedding
+        except (OSError, ValueError):
+            return None
+
+    return None
+
+
+def _cache_put_memory(key: str, embedding: List[float]) -> None:
+    """Store an embedding in the bounded in-memory LRU"""
+    _embedding_cache[key] = embedding
+    _embedding_cache.move_to_end(key)
+    while len(_embedding_cache) > settings.embedding_cache_size:
+        _embedding_cache.popitem(last=False)
+
+
+def _cache_put(key: str, embedding: List[float]) -> None:
+    """Store an embedding in both cache tiers"""
+    _cache_put_memory(key, embedding)
+
+    path = _disk_cache_path(key)
+    if path:
+        try:
+            os.makedirs(settings.embedding_cache_dir, exist_ok=True)
+            # float32 halves the bytes vs pickled Python floats
+            with open(path, "wb") as f:
+                f.write(array("f", embedding).tobytes())
+        except OSError:
+            pass  # Disk cache is best-effort
 
 
 async def generate_embedding(text: str) -> List[float]:
@@ -26,31 +95,102 @@ async def generate_embedding(text: str) -> List[float]:
     Raises:
         Exception: If embedding generation fails
     """
+    key = _cache_key(text, "retrieval_document")
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+
     try:
         # Generate embedding using Gemini
-        # Note: google-generativeai doesn't have async support yet, but operations are fast
-        result = genai.embed_content(
+        # The SDK is synchronous, so run it in a thread to avoid blocking the event loop
+        result = await asyncio.to_thread(
+            genai.embed_content,
             model=settings.gemini_embedding_model,
             content=text,
             task_type="retrieval_document",
             title=None
         )
-        
+
         embedding = result['embedding']
-        
+
         # Verify embedding dimensions
         if len(embedding) != settings.gemini_embedding_dimensions:
             raise ValueError(
                 f"Expected {settings.gemini_embedding_dimensions} dimensions, "
                 f"got {len(embedding)}"
             )
-        
+
+        _cache_put(key, embedding)
         return embedding
-        
+
     except Exception as e:
         raise Exception(f"Failed to generate embedding: {str(e)}")
 
 
+async def generate_embeddings_batch(
+    texts: List[str],
+    task_type: str = "retrieval_document"
+) -> List[List[float]]:
+    """
+    Generate embeddings for multiple texts in a single API round trip
+
+    Args:
+        texts: List of texts to generate embeddings for
+        task_type: Gemini task type (retrieval_document or retrieval_query)
+
+    Returns:
+        List of embedding vectors, one per input text
+
+    Raises:
+        Exception: If embedding generation fails
+    """
+    if not texts:
+        return []
+
+    try:
+        # embed_content accepts a list of contents and returns a list of vectors;
+        # run in a thread since the SDK is synchronous
+        result = await asyncio.to_thread(
+            genai.embed_content,
+            model=settings.gemini_embedding_model,
+            content=texts,
+            task_type=task_type
+        )
+
+        embeddings = result['embedding']
+
+        for embedding in embeddings:
+            if len(embedding) != settings.gemini_embedding_dimensions:
+                raise ValueError(
+                    f"Expected {settings.gemini_embedding_dimensions} dimensions, "
+                    f"got {len(embedding)}"
+                )
+
+        return embeddings
+
+    except Exception as e:
+        raise Exception(f"Failed to generate batch embeddings: {str(e)}")
+
+
+# Gemini embedding input is capped at ~2048 tokens; anything beyond that is
+# truncated server-side, so copying larger text into the request is wasted
+# allocation and wire bytes. Trim client-side first.
+_EMBED_MAX_TITLE_CHARS = 500
+_EMBED_MAX_CONTENT_CHARS = 8000
+
+
+def combine_note_text(title: str, content: str, tags: List[str]) -> str:
+    """Combine note fields into a single text for embedding"""
+    # Single join instead of f-string concat + conditional rewrite;
+    # this runs once per note in the bulk path, so allocations matter
+    parts = [title[:_EMBED_MAX_TITLE_CHARS], content[:_EMBED_MAX_CONTENT_CHARS]]
+
+    if tags:
+        parts.append("Tags: " + ", ".join(tags))
+
+    return "\n\n".join(parts)
+
+
 async def generate_note_embedding(title: str, content: str, tags: List[str]) -> List[float]:
     """
     Generate embedding for a note by combining title, content, and tags
@@ -64,12 +204,8 @@ async def generate_note_embedding(title: str, content: str, tags: List[str]) ->
         Embedding vector
     """
     # Combine all text for comprehensive semantic representation
-    combined_text = f"{title}\n\n{content}"
-    
-    if tags:
-        tags_text = ", ".join(tags)
-        combined_text += f"\n\nTags: {tags_text}"
-    
+    combined_text = combine_note_text(title, content, tags)
+
     return await generate_embedding(combined_text)
 
 
@@ -83,22 +219,31 @@ async def generate_query_embedding(query: str) -> List[float]:
     Returns:
         Embedding vector
     """
+    # Repeated searches for the same text (re-run test suites, re-fired
+    # autocomplete) hit the cache and skip the embedding API entirely
+    key = _cache_key(query, "retrieval_query")
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+
     try:
         # Use retrieval_query task type for search queries
-        result = genai.embed_content(
+        result = await asyncio.to_thread(
+            genai.embed_content,
             model=settings.gemini_embedding_model,
             content=query,
             task_type="retrieval_query"
         )
-        
+
         embedding = result['embedding']
-        
+
         if len(embedding) != settings.gemini_embedding_dimensions:
             raise ValueError(
                 f"Expected {settings.gemini_embedding_dimensions} dimensions, "
                 f"got {len(embedding)}"
             )
-        
+
+        _cache_put(key, embedding)
         return embedding
     except Exception as e:
         raise Exception(f"Failed to generate query embedding: {str(e)}")
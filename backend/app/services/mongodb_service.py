@@ -4,10 +4,19 @@ Handles note storage and vector search with MongoDB Atlas
 """
 
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase, AsyncIOMotorCollection
+from pymongo import IndexModel
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from bson import ObjectId
+from bson.binary import Binary
 import logging
+import time
+
+try:
+    # The BinData vector API ships with pymongo >= 4.10
+    from bson.binary import BinaryVectorDtype
+except ImportError:
+    BinaryVectorDtype = None
 
 from app.config import get_settings
 
@@ -15,23 +24,80 @@ settings = get_settings()
 logger = logging.getLogger(__name__)
 
 
+def _to_binary_vector(embedding: List[float]) -> Any:
+    """
+    Pack an embedding into BSON BinData as float32
+
+    Python floats are stored as 8-byte doubles in BSON, so a 768-dim vector
+    costs ~6 KB per note; float32 BinData halves that on disk and on the wire,
+    and Atlas Vector Search scores BinData vectors natively. Drivers older
+    than pymongo 4.10 lack the vector API, so the embedding is stored as a
+    plain float array there.
+    """
+    if BinaryVectorDtype is None:
+        return embedding
+    return Binary.from_vector(embedding, BinaryVectorDtype.FLOAT32)
+
+
+def _from_binary_vector(value: Any) -> List[float]:
+    """Unpack a float32 BinData vector back into a list of floats"""
+    if BinaryVectorDtype is not None and isinstance(value, Binary):
+        return list(value.as_vector().data)
+    # Plain float arrays: legacy documents, or writes from older drivers
+    return value
+
+
 class MongoDBService:
     """MongoDB service for async operations"""
     
     client: Optional[AsyncIOMotorClient] = None
     db: Optional[AsyncIOMotorDatabase] = None
     collection: Optional[AsyncIOMotorCollection] = None
-    
+
+    # Health-check ping result cache; liveness probes can arrive every few
+    # seconds per replica and each live ping is a full Atlas round trip
+    _PING_CACHE_TTL = 2.0
+    _last_ping_ok: bool = False
+    _last_ping_ts: float = 0.0
+
     async def connect(self):
         """Connect to MongoDB"""
         try:
-            self.client = AsyncIOMotorClient(settings.mongodb_uri)
+            # Explicit pool sizing and timeouts: the 30s default server
+            # selection timeout lets failed requests pile up under burst
+            # load; zlib wire compression shrinks embedding payloads
+            self.client = AsyncIOMotorClient(
+                settings.mongodb_uri,
+                maxPoolSize=200,
+                minPoolSize=10,
+                serverSelectionTimeoutMS=5000,
+                connectTimeoutMS=5000,
+                socketTimeoutMS=10000,
+                retryWrites=True,
+                compressors="zlib"
+            )
             self.db = self.client[settings.mongodb_database]
             self.collection = self.db[settings.mongodb_collection]
             
             # Test connection
             await self.client.admin.command('ping')
             logger.info(f"Connected to MongoDB: {settings.mongodb_database}")
+
+            # Compound indexes so per-user listings are bounded index range
+            # scans instead of scans + in-memory sorts; one round trip for
+            # both builds, idempotent on re-run
+            await self.collection.create_indexes([
+                IndexModel(
+                    [("user_id", 1), ("updated_at", -1)],
+                    name="user_updated_idx",
+                    background=True
+                ),
+                IndexModel(
+                    [("user_id", 1), ("created_at", -1)],
+                    name="user_created_idx",
+                    background=True
+                )
+            ])
             
         except Exception as e:
             logger.error(f"Failed to connect to MongoDB: {str(e)}")
@@ -44,14 +110,22 @@ class MongoDBService:
             logger.info("Disconnected from MongoDB")
     
     async def is_connected(self) -> bool:
-        """Check if MongoDB is connected"""
+        """Check if MongoDB is connected (ping result cached briefly)"""
+        now = time.monotonic()
+        if now - self._last_ping_ts < self._PING_CACHE_TTL:
+            return self._last_ping_ok
+
+        ping_ok = False
         try:
             if self.client:
                 await self.client.admin.command('ping')
-                return True
+                ping_ok = True
         except Exception:
             pass
-        return False
+
+        self._last_ping_ok = ping_ok
+        self._last_ping_ts = now
+        return ping_ok
     
     async def create_note(
         self,
@@ -60,35 +134,76 @@ class MongoDBService:
         user_id: str,
         tags: List[str],
         embedding: List[float]
-    ) -> str:
+    ) -> Dict[str, Any]:
         """
         Create a new note with embedding
-        
+
         Args:
             title: Note title
             content: Note content
             user_id: User identifier
             tags: List of tags
             embedding: Vector embedding
-            
+
         Returns:
-            Created note ID as string
+            Created note document with string ID and timestamps
         """
         now = datetime.utcnow()
-        
+
         note_doc = {
             "title": title,
             "content": content,
             "user_id": user_id,
             "tags": tags,
-            "embedding": embedding,
+            "embedding": _to_binary_vector(embedding),
             "created_at": now,
             "updated_at": now
         }
-        
+
         result = await self.collection.insert_one(note_doc)
-        return str(result.inserted_id)
-    
+
+        # All fields are already in memory, so build the response document
+        # locally instead of re-fetching what we just wrote
+        created = {k: v for k, v in note_doc.items() if k != "embedding"}
+        created["_id"] = str(result.inserted_id)
+        return created
+
+    async def create_notes(self, notes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Create multiple notes in a single round trip
+
+        Args:
+            notes: List of note dicts with title, content, user_id, tags, embedding
+
+        Returns:
+            List of created note documents with string IDs and timestamps
+        """
+        now = datetime.utcnow()
+
+        docs = [
+            {
+                **note,
+                "embedding": _to_binary_vector(note["embedding"]),
+                "created_at": now,
+                "updated_at": now
+            }
+            for note in notes
+        ]
+
+        # Unordered insert lets the server parallelize and keeps one bad
+        # document from aborting the rest of the batch
+        await self.collection.insert_many(docs, ordered=False)
+
+        # Return the documents without the packed embedding payload,
+        # mirroring create_note
+        return [
+            {
+                **{k: v for k, v in doc.items() if k != "embedding"},
+                "_id": str(doc["_id"])
+            }
+            for doc in docs
+        ]
+
     async def get_note(self, note_id: str) -> Optional[Dict[str, Any]]:
         """Get a note by ID"""
         try:
@@ -100,31 +215,68 @@ class MongoDBService:
             logger.error(f"Error fetching note {note_id}: {str(e)}")
             return None
     
+    async def get_note_embedding(self, note_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetch just a note's owner and stored embedding, decoded to floats
+
+        Args:
+            note_id: Note identifier
+
+        Returns:
+            Dict with user_id and embedding, or None if the note (or its
+            embedding) is missing
+        """
+        try:
+            doc = await self.collection.find_one(
+                {"_id": ObjectId(note_id)},
+                {"embedding": 1, "user_id": 1}
+            )
+        except Exception as e:
+            logger.error(f"Error fetching embedding for note {note_id}: {str(e)}")
+            return None
+
+        if not doc or "embedding" not in doc:
+            return None
+        return {
+            "user_id": doc["user_id"],
+            "embedding": _from_binary_vector(doc["embedding"])
+        }
+
     async def vector_search(
         self,
         query_embedding: List[float],
         user_id: str,
-        limit: int = 10
+        limit: int = 10,
+        min_score: float = 0.0
     ) -> List[Dict[str, Any]]:
         """
         Perform vector search with user filter
-        
+
         Args:
             query_embedding: Query vector embedding
             user_id: User ID to filter results
             limit: Maximum number of results
-            
+            min_score: Drop results scoring below this threshold
+
         Returns:
             List of matching notes with scores
         """
         try:
+            # Scale oversampling with the requested limit so high-limit
+            # queries don't truncate the candidate set after the
+            # user_id pre-filter is applied; cap to bound Atlas work
+            num_candidates = min(
+                max(limit * 10, settings.vector_search_num_candidates),
+                1000
+            )
+
             pipeline = [
                 {
                     "$vectorSearch": {
                         "index": settings.mongodb_vector_index_name,
                         "path": "embedding",
                         "queryVector": query_embedding,
-                        "numCandidates": settings.vector_search_num_candidates,
+                        "numCandidates": num_candidates,
                         "limit": limit,
                         "filter": {
                             "user_id": {"$eq": user_id}
@@ -144,33 +296,68 @@ class MongoDBService:
                     }
                 }
             ]
-            
+
+            # Terminate weak matches server-side so callers don't pay
+            # network cost for results they would discard anyway
+            if min_score > 0.0:
+                pipeline.append({"$match": {"score": {"$gte": min_score}}})
+
+            # Convert ObjectId to string server-side instead of looping in Python
+            pipeline.append({"$addFields": {"_id": {"$toString": "$_id"}}})
+
             cursor = self.collection.aggregate(pipeline)
-            results = await cursor.to_list(length=limit)
-            
-            # Convert ObjectId to string
-            for result in results:
-                result["_id"] = str(result["_id"])
-            
-            return results
+            return await cursor.to_list(length=limit)
             
         except Exception as e:
             logger.error(f"Vector search error: {str(e)}")
             raise Exception(f"Vector search failed: {str(e)}")
     
-    async def list_notes(self, user_id: str, limit: int = 100) -> List[Dict[str, Any]]:
+    def _list_notes_pipeline(
+        self,
+        user_id: str,
+        limit: int,
+        include_content: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Aggregation pipeline for listing a user's notes, newest first"""
+        projection = {"embedding": 0}  # Exclude embedding from results
+        if not include_content:
+            # Summary listings skip the content body entirely, so large
+            # notes never leave the server
+            projection["content"] = 0
+
+        return [
+            {"$match": {"user_id": user_id}},
+            {"$sort": {"updated_at": -1}},
+            {"$limit": limit},
+            {"$project": projection},
+            # Convert ObjectId to string server-side instead of looping in Python
+            {"$addFields": {"_id": {"$toString": "$_id"}}}
+        ]
+
+    async def list_notes(
+        self,
+        user_id: str,
+        limit: int = 100,
+        include_content: bool = True
+    ) -> List[Dict[str, Any]]:
         """List all notes for a user"""
-        cursor = self.collection.find(
-            {"user_id": user_id},
-            {"embedding": 0}  # Exclude embedding from results
-        ).sort("updated_at", -1).limit(limit)
-        
-        notes = await cursor.to_list(length=limit)
-        
-        for note in notes:
-            note["_id"] = str(note["_id"])
-        
-        return notes
+        cursor = self.collection.aggregate(
+            self._list_notes_pipeline(user_id, limit, include_content)
+        )
+        return await cursor.to_list(length=limit)
+
+    async def iter_notes(self, user_id: str, limit: int = 100):
+        """
+        Yield a user's notes one at a time without materializing the full list
+
+        Args:
+            user_id: User identifier
+            limit: Maximum number of notes to yield
+        """
+        cursor = self.collection.aggregate(self._list_notes_pipeline(user_id, limit))
+
+        async for note in cursor:
+            yield note
 
 
 # Global MongoDB service instance
@@ -0,0 +1,109 @@
+"""
+Shared health probe for the backend test drivers.
+
+Each /health hit costs the server a MongoDB ping plus key validation, so
+when several drivers run back to back (or pytest spawns multiple worker
+processes) the probe result is cached twice over: in a module-level
+variable for the current process and in a small temp file so successive
+processes within the TTL skip the request entirely.
+"""
+
+import os
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+import orjson
+
+BASE_URL = "http://localhost:8000"
+
+# How long a probe result stays valid, in seconds
+PROBE_TTL = 30.0
+
+_PROBE_FILE = os.path.join(tempfile.gettempdir(), ".mindvault_health.json")
+
+_cached: Optional["HealthStatus"] = None
+_cached_at = 0.0
+
+
+@dataclass
+class HealthStatus:
+    """One /health probe result"""
+    status: str
+    version: str
+    mongodb_connected: bool
+    gemini_configured: bool
+
+    @property
+    def healthy(self) -> bool:
+        return self.status == "healthy" and self.mongodb_connected
+
+
+def _from_payload(data: dict) -> HealthStatus:
+    """Build a HealthStatus from the /health response body"""
+    return HealthStatus(
+        status=data.get("status", "unknown"),
+        version=data.get("version", ""),
+        mongodb_connected=bool(data.get("mongodb_connected")),
+        gemini_configured=bool(data.get("openai_configured"))
+    )
+
+
+def _load_cached() -> Optional[HealthStatus]:
+    """Return a probe result still within the TTL, or None"""
+    global _cached, _cached_at
+
+    now = time.monotonic()
+    if _cached is not None and now - _cached_at < PROBE_TTL:
+        return _cached
+
+    # Cross-process cache: successive driver/pytest processes reuse the
+    # probe another process made moments ago
+    try:
+        if time.time() - os.path.getmtime(_PROBE_FILE) < PROBE_TTL:
+            with open(_PROBE_FILE, "rb") as f:
+                status = HealthStatus(**orjson.loads(f.read()))
+            _cached, _cached_at = status, now
+            return status
+    except (OSError, TypeError, ValueError):
+        pass
+    return None
+
+
+def _store(status: HealthStatus) -> None:
+    """Cache a successful probe in memory and on disk (best-effort)"""
+    global _cached, _cached_at
+
+    _cached, _cached_at = status, time.monotonic()
+    try:
+        with open(_PROBE_FILE, "wb") as f:
+            f.write(orjson.dumps(asdict(status)))
+    except OSError:
+        pass
+
+
+def probe_health(session, base_url: str = BASE_URL) -> HealthStatus:
+    """Probe /health through a sync client, reusing any cached result"""
+    cached = _load_cached()
+    if cached is not None:
+        return cached
+
+    response = session.get(f"{base_url}/health", timeout=5)
+    response.raise_for_status()
+    status = _from_payload(orjson.loads(response.content))
+    _store(status)
+    return status
+
+
+async def probe_health_async(client, base_url: str = BASE_URL) -> HealthStatus:
+    """Probe /health through an async client, reusing any cached result"""
+    cached = _load_cached()
+    if cached is not None:
+        return cached
+
+    response = await client.get(f"{base_url}/health", timeout=5)
+    response.raise_for_status()
+    status = _from_payload(orjson.loads(response.content))
+    _store(status)
+    return status
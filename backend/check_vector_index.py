@@ -73,6 +73,9 @@ Vector Search indexes must be created through MongoDB Atlas UI:
   ]
 }
 
+Note: embeddings are stored as float32 BinData (BSON binary subtype 9),
+which the "vector" field type indexes natively.
+
 10. Click "Create Search Index"
 11. Wait 2-5 minutes for index to become "Active"
 
@@ -0,0 +1,75 @@
+"""
+Shared pytest fixtures for the backend test drivers.
+
+The drivers stay runnable as plain scripts (python test_*.py); under
+pytest they share a single session-scoped httpx.AsyncClient so the whole
+run reuses one connection pool, and files can run in parallel processes
+with pytest-xdist (pytest -n auto --dist=loadfile).
+"""
+
+import asyncio
+
+import httpx
+import pytest
+import pytest_asyncio
+
+BASE_URL = "http://localhost:8000"
+
+# Cap in-flight requests so concurrent phases don't trip rate limits
+MAX_CONCURRENCY = 4
+
+
+@pytest_asyncio.fixture(scope="session")
+async def client():
+    """One async client (and connection pool) for the whole session"""
+    async with httpx.AsyncClient(
+        base_url=BASE_URL,
+        http2=True,
+        timeout=30,
+        headers={
+            "Content-Type": "application/json",
+            "Accept-Encoding": "gzip",
+        },
+    ) as c:
+        yield c
+
+
+@pytest.fixture(scope="session")
+def semaphore():
+    """Bounded concurrency for tests that fan out requests"""
+    return asyncio.Semaphore(MAX_CONCURRENCY)
+
+
+@pytest.fixture(scope="session")
+def cache():
+    """On-disk embedding cache shared by the flow tests, saved at teardown"""
+    from test_complete_flow import _load_embedding_cache, _save_embedding_cache
+
+    cache = _load_embedding_cache()
+    yield cache
+    _save_embedding_cache(cache)
+
+
+@pytest.fixture
+def query():
+    """A single representative search query for the flow tests"""
+    from test_complete_flow import SEARCH_QUERIES
+
+    return SEARCH_QUERIES[0]
+
+
+@pytest.fixture
+def queries():
+    """The full search query set for the batched flow test"""
+    from test_complete_flow import SEARCH_QUERIES
+
+    return SEARCH_QUERIES
+
+
+@pytest.fixture
+def note():
+    """Source note for the related-notes flow test: the one the creation
+    test made earlier in the file, if it succeeded"""
+    from test_complete_flow import INITIAL_NOTE, _state
+
+    return _state.get('note') or {**INITIAL_NOTE, "_id": ""}